@@ -0,0 +1,51 @@
+"""Initial schema
+
+Matches the tables previously created by Base.metadata.create_all on startup.
+Existing databases created that way can be marked with `alembic stamp 0001`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sessions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.Column("summary", sa.Text(), nullable=True),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("last_user_message", sa.Text(), nullable=True),
+        sa.Column("last_assistant_reply", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "safety_interventions",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("session_id_prefix", sa.String(length=8), nullable=False),
+        sa.Column(
+            "category",
+            sa.Enum("MEDICAL", "LEGAL", "CRISIS", "INAPPROPRIATE", name="safetycategory"),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("safety_interventions")
+    op.drop_table("sessions")
+    sa.Enum(name="safetycategory").drop(op.get_bind(), checkfirst=True)
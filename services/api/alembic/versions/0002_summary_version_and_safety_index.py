@@ -0,0 +1,30 @@
+"""Add sessions.summary_version and safety intervention index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-14
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("sessions", sa.Column("summary_version", sa.String(length=16), nullable=True))
+    op.create_index(
+        "ix_safety_session_prefix_created",
+        "safety_interventions",
+        ["session_id_prefix", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_safety_session_prefix_created", table_name="safety_interventions")
+    op.drop_column("sessions", "summary_version")
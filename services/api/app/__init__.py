@@ -0,0 +1,10 @@
+import asyncio
+
+# Use uvloop for event loops created outside Uvicorn (e.g. Alembic, scripts).
+# Uvicorn selects it itself via --loop uvloop.
+try:
+    import uvloop
+except ImportError:
+    pass
+else:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
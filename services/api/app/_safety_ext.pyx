@@ -0,0 +1,118 @@
+# cython: language_level=3
+# distutils: libraries = pcre2-8
+# distutils: define_macros = PCRE2_CODE_UNIT_WIDTH=8
+"""
+PCRE2-JIT matcher for SafetyRouter.
+
+Compiles every safety pattern with PCRE2 and JIT-compiles it, then checks a
+message against all of them in one call, so there is no Python/C round-trip
+per pattern.
+
+Build with `cythonize -i app/_safety_ext.pyx` (needs Cython, a C compiler and
+libpcre2-dev). This is the production matcher; safety.py falls back to the
+stdlib re engine when the module can't be imported.
+"""
+
+from libc.stdint cimport uint32_t
+from libc.stdlib cimport calloc, free
+
+
+cdef extern from "pcre2.h":
+    ctypedef struct pcre2_code:
+        pass
+    ctypedef struct pcre2_match_data:
+        pass
+    ctypedef struct pcre2_compile_context:
+        pass
+    ctypedef struct pcre2_match_context:
+        pass
+    ctypedef struct pcre2_general_context:
+        pass
+    ctypedef unsigned char PCRE2_UCHAR
+    ctypedef const unsigned char *PCRE2_SPTR
+    ctypedef size_t PCRE2_SIZE
+
+    uint32_t PCRE2_JIT_COMPLETE
+
+    pcre2_code *pcre2_compile(PCRE2_SPTR pattern, PCRE2_SIZE length, uint32_t options,
+                              int *errorcode, PCRE2_SIZE *erroroffset,
+                              pcre2_compile_context *ccontext)
+    int pcre2_jit_compile(pcre2_code *code, uint32_t options)
+    pcre2_match_data *pcre2_match_data_create(uint32_t ovecsize, pcre2_general_context *gcontext)
+    int pcre2_match(const pcre2_code *code, PCRE2_SPTR subject, PCRE2_SIZE length,
+                    PCRE2_SIZE startoffset, uint32_t options, pcre2_match_data *match_data,
+                    pcre2_match_context *mcontext)
+    int pcre2_jit_match(const pcre2_code *code, PCRE2_SPTR subject, PCRE2_SIZE length,
+                        PCRE2_SIZE startoffset, uint32_t options, pcre2_match_data *match_data,
+                        pcre2_match_context *mcontext)
+    int pcre2_get_error_message(int errorcode, PCRE2_UCHAR *buffer, PCRE2_SIZE bufflen)
+    void pcre2_code_free(pcre2_code *code)
+    void pcre2_match_data_free(pcre2_match_data *match_data)
+
+
+cdef class SafetyRouterC:
+    """
+    Safety patterns compiled with PCRE2 and matched in priority order.
+
+    The GIL is held throughout, so the shared match data is never used by
+    two threads at once.
+    """
+
+    cdef pcre2_code **_codes
+    cdef bint *_jit
+    cdef int _count
+    cdef pcre2_match_data *_match_data
+
+    def __cinit__(self, patterns):
+        """
+        Args:
+            patterns: lowercase bytes patterns in priority order, matched
+                against already lowercased messages
+        """
+        cdef int errorcode
+        cdef PCRE2_SIZE erroroffset
+        cdef PCRE2_UCHAR message[256]
+        cdef bytes pattern
+
+        self._count = len(patterns)
+        self._codes = <pcre2_code **> calloc(self._count, sizeof(pcre2_code *))
+        self._jit = <bint *> calloc(self._count, sizeof(bint))
+        self._match_data = pcre2_match_data_create(1, NULL)
+        if self._codes == NULL or self._jit == NULL or self._match_data == NULL:
+            raise MemoryError()
+
+        for i, pattern in enumerate(patterns):
+            self._codes[i] = pcre2_compile(pattern, len(pattern), 0,
+                                           &errorcode, &erroroffset, NULL)
+            if self._codes[i] == NULL:
+                pcre2_get_error_message(errorcode, message, sizeof(message))
+                raise ValueError(
+                    f"PCRE2 compile error at offset {erroroffset}: {(<bytes> message).decode()}"
+                )
+            # Patterns that can't be JIT-compiled still match via the interpreter
+            self._jit[i] = pcre2_jit_compile(self._codes[i], PCRE2_JIT_COMPLETE) == 0
+
+    def __dealloc__(self):
+        if self._codes != NULL:
+            for i in range(self._count):
+                if self._codes[i] != NULL:
+                    pcre2_code_free(self._codes[i])
+            free(self._codes)
+        free(self._jit)
+        if self._match_data != NULL:
+            pcre2_match_data_free(self._match_data)
+
+    def first_match(self, bytes message):
+        """Index of the first pattern that matches message, or -1."""
+        cdef PCRE2_SPTR subject = message
+        cdef PCRE2_SIZE length = len(message)
+        cdef int i, rc
+
+        for i in range(self._count):
+            if self._jit[i]:
+                rc = pcre2_jit_match(self._codes[i], subject, length, 0, 0, self._match_data, NULL)
+            else:
+                rc = pcre2_match(self._codes[i], subject, length, 0, 0, self._match_data, NULL)
+            if rc >= 0:
+                return i
+        return -1
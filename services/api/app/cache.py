@@ -0,0 +1,77 @@
+"""
+Reply cache for Life Story Chatbot.
+
+Exact-match Redis cache in front of the LLM call, keyed by the current
+conversation summary and the normalized user message. Common openers
+("hi", "how are you") against the same summary are answered from the cache.
+
+Disabled unless REDIS_URL is set.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from typing import Optional
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Seconds a cached reply stays valid
+REPLY_CACHE_TTL = int(os.getenv("REPLY_CACHE_TTL", "3600"))
+
+# Longer messages are unlikely to repeat and are not cached
+REPLY_CACHE_MAX_MESSAGE_LENGTH = int(os.getenv("REPLY_CACHE_MAX_MESSAGE_LENGTH", "200"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+logger = logging.getLogger("lifestory.cache")
+
+# Initialize Redis client
+redis_client = None
+if REDIS_URL:
+    import redis.asyncio as redis
+
+    redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase, strip and collapse whitespace so trivial variants share a key."""
+    return _WHITESPACE.sub(" ", message.lower()).strip()
+
+
+def reply_cache_key(summary: Optional[str], message: str) -> str:
+    """
+    Build the cache key for a (summary, message) pair.
+
+    The summary is what keeps one user's personalized replies from being served
+    to another, so both parts use full SHA-256 digests.
+    """
+    summary_hash = hashlib.sha256((summary or "").encode()).hexdigest()
+    message_hash = hashlib.sha256(normalize_message(message).encode()).hexdigest()
+    return f"reply:{summary_hash}:{message_hash}"
+
+
+def is_cacheable(message: str) -> bool:
+    """Only short messages are worth caching."""
+    return redis_client is not None and len(message) <= REPLY_CACHE_MAX_MESSAGE_LENGTH
+
+
+async def get_cached_reply(summary: Optional[str], message: str) -> Optional[str]:
+    """Return a cached reply, or None on a miss or if the cache is unavailable."""
+    if not is_cacheable(message):
+        return None
+    try:
+        return await redis_client.get(reply_cache_key(summary, message))
+    except Exception as e:
+        logger.warning("Reply cache read error: %s", e)
+        return None
+
+
+async def cache_reply(summary: Optional[str], message: str, reply: str) -> None:
+    """Store a reply in the cache. Failures are logged and otherwise ignored."""
+    if not reply or not is_cacheable(message):
+        return
+    try:
+        await redis_client.setex(reply_cache_key(summary, message), REPLY_CACHE_TTL, reply)
+    except Exception as e:
+        logger.warning("Reply cache write error: %s", e)
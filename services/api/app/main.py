@@ -1,84 +1,177 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
+from datetime import datetime
+from contextlib import asynccontextmanager
+import hashlib
+import logging
 import os
 import uuid
-from openai import OpenAI
-from sqlalchemy.orm import Session as DBSession
-from sqlalchemy import text
+from openai import AsyncOpenAI
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, delete, null, text, update
 
-from .safety import SafetyRouter
-from .database import get_db, init_db
-from .models import Session, SafetyIntervention, SafetyCategory
-from . import prompts
+from .safety import SafetyCategory, SafetyRouter, get_safety_router
+from .database import AsyncSessionLocal, engine, get_db, init_db
+from .logging_config import configure_logging, shutdown_logging
+from .models import Session
+from . import cache, prompts, safety_log
 
-app = FastAPI(title="Life Story Chatbot API")
+configure_logging()
+logger = logging.getLogger("lifestory")
 
-# Add CORS middleware - allow all origins for development
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm the connection pool and the safety router on startup, and release
+    the pool on shutdown.
+
+    The schema is managed by Alembic migrations run once before deploy.
+    Set RUN_DDL=1 to create missing tables at startup instead (local development).
+    """
+    if os.getenv("RUN_DDL") == "1":
+        await init_db()
+        logger.info("Database initialized")
+
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+    # Compile the safety patterns now rather than in the first /chat request
+    get_safety_router()
+
+    await safety_log.start()
+
+    yield
+
+    await safety_log.stop()
+    await engine.dispose()
+    shutdown_logging()
+
+
+app = FastAPI(
+    title="Life Story Chatbot API",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
+
+# Allowed browser origins, comma-separated (defaults to the local web app)
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
+]
+
+# Add CORS middleware - preflight requests are answered here without routing,
+# and browsers may cache them for max_age seconds
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins for development
-    allow_credentials=False,  # Set to False when using allow_origins=["*"]
+    allow_origins=CORS_ORIGINS,
+    allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,
 )
 
+# Compress larger responses (e.g. sessions with long summaries); small /chat
+# replies stay under minimum_size and skip the compression cost
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Initialize OpenAI client
 openai_client = None
 if os.getenv("OPENAI_API_KEY"):
-    openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-# Initialize safety router
-safety_router = SafetyRouter()
+    openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Summary generation frequency (every N messages)
 SUMMARY_FREQUENCY = 4
 
 
-@app.on_event("startup")
-def on_startup():
-    """Initialize database tables on startup."""
-    init_db()
-    print("Database initialized")
-
 class ChatIn(BaseModel):
-    session_id: str
+    # Omitted for a new conversation; a session is created server-side
+    session_id: Optional[uuid.UUID] = None
     message: str
 
 class ChatOut(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
     session_id: str
     reply: str
     has_summary: bool = False
 
 class SessionOut(BaseModel):
-    session_id: str
+    # Built directly from the Session ORM object
+    model_config = ConfigDict(from_attributes=True)
+
+    session_id: uuid.UUID = Field(validation_alias="id")
     message_count: int
     summary: Optional[str] = None
-    created_at: str
-    updated_at: str
+    created_at: datetime
+    updated_at: datetime
 
 
-def get_or_create_session(db: DBSession, session_id: str) -> Session:
+async def get_or_create_session(db: AsyncSession, session_uuid: Optional[uuid.UUID]) -> Session:
     """Load existing session or create a new one."""
-    try:
-        session_uuid = uuid.UUID(session_id)
-    except ValueError:
-        # Invalid UUID, create new one
+    if session_uuid is None:
         session_uuid = uuid.uuid4()
 
-    session = db.query(Session).filter(Session.id == session_uuid).first()
+    session = await db.get(Session, session_uuid)
 
     if not session:
-        session = Session(id=session_uuid)
+        # Populate every column up front so no refresh is needed after commit
+        now = datetime.utcnow()
+        session = Session(
+            id=session_uuid,
+            created_at=now,
+            updated_at=now,
+            message_count=0,
+            summary=None,
+        )
         db.add(session)
-        db.commit()
-        db.refresh(session)
+        await db.commit()
 
     return session
 
 
-def generate_summary(existing_summary: Optional[str], user_message: str, assistant_reply: str) -> str:
+async def generate_reply(session: Session, user_message: str) -> str:
+    """Generate the assistant reply for a user message using the LLM."""
+    # The base system prompt is always sent verbatim as the first message so
+    # the prefix stays identical across requests and hits the prompt cache
+    messages = [{"role": "system", "content": prompts.SYSTEM_BASE}]
+
+    # Add conversation summary context if available, as a separate message
+    if session.summary:
+        messages.append({
+            "role": "system",
+            "content": prompts.render_prompt("system", "summary_context", summary=session.summary),
+        })
+
+    messages.append({"role": "user", "content": user_message})
+
+    # Call OpenAI API
+    response = await openai_client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=messages,
+        max_tokens=300,
+        temperature=0.7,
+        user=str(session.id),
+        # Stable between summary updates so requests route to the same cache shard
+        extra_body={"prompt_cache_key": f"{session.id.hex[:8]}:{session.summary_version or '0'}"},
+    )
+
+    return response.choices[0].message.content
+
+
+def compute_summary_version(summary: Optional[str]) -> Optional[str]:
+    """Short deterministic hash identifying a summary revision."""
+    if not summary:
+        return None
+    return hashlib.md5(summary.encode()).hexdigest()[:8]
+
+
+async def generate_summary(existing_summary: Optional[str], user_message: str, assistant_reply: str) -> str:
     """
     Generate an updated conversation summary using the LLM.
 
@@ -88,8 +181,6 @@ def generate_summary(existing_summary: Optional[str], user_message: str, assista
     if not openai_client:
         return existing_summary or ""
 
-    summary_prompt = prompts.get_prompt("summary", "system")
-
     if existing_summary:
         context = prompts.render_prompt(
             "summary", "update",
@@ -105,39 +196,65 @@ def generate_summary(existing_summary: Optional[str], user_message: str, assista
         )
 
     try:
-        response = openai_client.chat.completions.create(
+        response = await openai_client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": summary_prompt},
+                {"role": "system", "content": prompts.SUMMARY_SYSTEM},
                 {"role": "user", "content": context}
             ],
-            max_tokens=200,
-            temperature=0.5
+            # Deterministic output keeps summaries (and summary_version) stable
+            max_tokens=120,
+            temperature=0,
+            stream=True
         )
-        return response.choices[0].message.content
+        parts = []
+        async for chunk in response:
+            if chunk.choices:
+                parts.append(chunk.choices[0].delta.content or "")
+        return "".join(parts) or existing_summary or ""
     except Exception as e:
-        print(f"Summary generation error: {e}")
+        logger.warning("Summary generation error: %s", e)
         return existing_summary or ""
 
 
-def log_safety_intervention_to_db(db: DBSession, session_id: str, category: str):
-    """Log safety intervention to database with truncated session ID."""
+async def generate_summary_and_persist(
+    session_uuid: uuid.UUID,
+    message_count: int,
+    existing_summary: Optional[str],
+    user_message: str,
+    assistant_reply: str,
+):
+    """Generate an updated summary and store it on the session.
+
+    Runs as a background task after the chat response is returned, so it opens
+    its own database session. message_count is the session's count after the
+    summarized turn; if another turn has landed since, its messages are kept.
+    """
+    new_summary = await generate_summary(existing_summary, user_message, assistant_reply)
+
+    # Clear temporary message storage only if it still holds the summarized turn
+    unchanged = Session.message_count == message_count
+
     try:
-        # Map string category to enum
-        category_map = {
-            "medical": SafetyCategory.MEDICAL,
-            "legal": SafetyCategory.LEGAL,
-            "crisis": SafetyCategory.CRISIS,
-            "inappropriate": SafetyCategory.INAPPROPRIATE,
-        }
-        intervention = SafetyIntervention(
-            session_id_prefix=session_id[:8],
-            category=category_map.get(category, SafetyCategory.INAPPROPRIATE)
-        )
-        db.add(intervention)
-        db.commit()
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Session)
+                .where(Session.id == session_uuid)
+                .values(
+                    summary=new_summary,
+                    summary_version=compute_summary_version(new_summary),
+                    last_user_message=case((unchanged, null()), else_=Session.last_user_message),
+                    last_assistant_reply=case((unchanged, null()), else_=Session.last_assistant_reply),
+                )
+            )
+            await db.commit()
     except Exception as e:
-        print(f"Failed to log safety intervention: {e}")
+        logger.warning("Failed to persist summary: %s", e)
+
+
+def log_safety_intervention_to_db(session_id: str, category: SafetyCategory):
+    """Queue a safety intervention for the batched database writer."""
+    safety_log.enqueue(session_id, category)
 
 
 @app.get("/health")
@@ -146,147 +263,128 @@ def health():
 
 
 @app.get("/health/db")
-def health_db(db: DBSession = Depends(get_db)):
+async def health_db(db: AsyncSession = Depends(get_db)):
     """Check database connectivity."""
     try:
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         return {"ok": True, "database": "connected"}
     except Exception as e:
         return {"ok": False, "database": str(e)}
 
-@app.options("/chat")
-async def chat_options():
-    return {"message": "OK"}
-
 @app.post("/chat", response_model=ChatOut)
-async def chat(payload: ChatIn, db: DBSession = Depends(get_db)):
+async def chat(
+    payload: ChatIn,
+    background_tasks: BackgroundTasks,
+    safety_router: SafetyRouter = Depends(get_safety_router),
+):
     # Check if OpenAI API key is configured
     if not openai_client:
         return ChatOut(
-            session_id=payload.session_id,
+            session_id=str(payload.session_id or ""),
             reply="OpenAI API key not configured. Please add OPENAI_API_KEY to your environment."
         )
 
-    # Load or create session from database
-    session = get_or_create_session(db, payload.session_id)
+    # Short DB scope: load or create the session.
+    # The connection goes back to the pool before the LLM call below.
+    async with AsyncSessionLocal() as db:
+        session = await get_or_create_session(db, payload.session_id)
+
+    session_uuid = session.id
+    has_summary = session.summary is not None
 
     # Safety check - intercept high-risk content before LLM call
     safety_result = safety_router.check_safety(payload.message)
 
     if not safety_result.is_safe:
-        # Log the safety intervention to database
+        # Queue the safety intervention for the batched database writer
         if safety_result.category:
-            log_safety_intervention_to_db(db, payload.session_id, safety_result.category.value)
+            log_safety_intervention_to_db(str(session_uuid), safety_result.category)
 
         # Return safe response template
         return ChatOut(
-            session_id=str(session.id),
+            session_id=str(session_uuid),
             reply=safety_result.safe_response,
-            has_summary=session.summary is not None
+            has_summary=has_summary
         )
 
     try:
-        # Build system prompt with conversation context
-        base_prompt = prompts.get_prompt("system", "base")
-
-        # Add conversation summary context if available
-        if session.summary:
-            system_prompt = prompts.render_prompt(
-                "system", "with_summary",
-                base=base_prompt,
-                summary=session.summary,
-            )
-        else:
-            system_prompt = base_prompt
-
-        # Call OpenAI API
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": payload.message}
-            ],
-            max_tokens=300,
-            temperature=0.7
-        )
-
-        reply = response.choices[0].message.content
-
-        # Update session state
-        session.message_count += 1
-        session.last_user_message = payload.message
-        session.last_assistant_reply = reply
-
-        # Generate summary every SUMMARY_FREQUENCY messages
+        # Serve repeated messages from the reply cache, falling back to the LLM
+        reply = await cache.get_cached_reply(session.summary, payload.message)
+        if reply is None:
+            reply = await generate_reply(session, payload.message)
+            await cache.cache_reply(session.summary, payload.message, reply)
+
+        # Second short DB scope: re-load the row and persist the updated state
+        async with AsyncSessionLocal() as db:
+            stored = await db.get(Session, session_uuid)
+            if stored is None:
+                # Deleted mid-request: nothing left to update or summarize
+                logger.info("Session %s... deleted during chat; turn not saved", str(session_uuid)[:8])
+                return ChatOut(
+                    session_id=str(session_uuid),
+                    reply=reply,
+                    has_summary=has_summary
+                )
+
+            session = stored
+            session.message_count += 1
+            session.last_user_message = payload.message
+            session.last_assistant_reply = reply
+
+            await db.commit()
+
+        # Generate summary every SUMMARY_FREQUENCY messages, after the response
+        # is sent so the user doesn't wait for a second LLM round-trip
         if session.message_count % SUMMARY_FREQUENCY == 0:
-            new_summary = generate_summary(
+            background_tasks.add_task(
+                generate_summary_and_persist,
+                session_uuid,
+                session.message_count,
                 session.summary,
                 payload.message,
                 reply
             )
-            session.summary = new_summary
-            # Clear temporary message storage after summary generation
-            session.last_user_message = None
-            session.last_assistant_reply = None
-
-        db.commit()
 
         return ChatOut(
-            session_id=str(session.id),
+            session_id=str(session_uuid),
             reply=reply,
-            has_summary=session.summary is not None
+            has_summary=has_summary
         )
 
     except Exception as e:
-        print(f"OpenAI API error: {e}")
+        logger.warning("OpenAI API error: %s", e)
         return ChatOut(
-            session_id=str(session.id),
+            session_id=str(session_uuid),
             reply="I'm having trouble connecting right now. Please try again in a moment.",
-            has_summary=session.summary is not None
+            has_summary=has_summary
         )
 
 
 # Session management endpoints
 
 @app.get("/sessions/{session_id}", response_model=SessionOut)
-async def get_session(session_id: str, db: DBSession = Depends(get_db)):
+async def get_session(session_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
     """Get session information including summary."""
-    try:
-        session_uuid = uuid.UUID(session_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid session ID format")
-
-    session = db.query(Session).filter(Session.id == session_uuid).first()
+    session = await db.get(Session, session_id)
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    return SessionOut(
-        session_id=str(session.id),
-        message_count=session.message_count,
-        summary=session.summary,
-        created_at=session.created_at.isoformat(),
-        updated_at=session.updated_at.isoformat()
-    )
+    return session
 
 
 @app.delete("/sessions/{session_id}")
-async def delete_session(session_id: str, db: DBSession = Depends(get_db)):
+async def delete_session(session_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
     """
     Delete a session and all associated data.
     GDPR compliance: allows users to request deletion of their data.
     """
-    try:
-        session_uuid = uuid.UUID(session_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid session ID format")
-
-    session = db.query(Session).filter(Session.id == session_uuid).first()
+    # Single DELETE statement instead of SELECT-then-DELETE
+    result = await db.execute(delete(Session).where(Session.id == session_id))
 
-    if not session:
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    db.delete(session)
-    db.commit()
+    await db.commit()
 
-    return {"message": "Session deleted successfully", "session_id": session_id}
+    return {"message": "Session deleted successfully", "session_id": str(session_id)}
@@ -6,19 +6,11 @@ Privacy-first design: stores summaries, not raw transcripts.
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, String, Text, Integer, DateTime, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
-import enum
 
 from .database import Base
-
-
-class SafetyCategory(enum.Enum):
-    """Categories for safety interventions."""
-    MEDICAL = "medical"
-    LEGAL = "legal"
-    CRISIS = "crisis"
-    INAPPROPRIATE = "inappropriate"
+from .safety import SafetyCategory  # Stored as-is, so the router's enum is the single definition
 
 
 class Session(Base):
@@ -37,6 +29,7 @@ class Session(Base):
 
     # Privacy-first summary storage
     summary = Column(Text, nullable=True)  # Latest conversation summary
+    summary_version = Column(String(16), nullable=True)  # Short hash of summary, for prompt caching
     message_count = Column(Integer, default=0, nullable=False)
 
     # Temporary storage for summary generation (cleared after summary is generated)
@@ -61,5 +54,10 @@ class SafetyIntervention(Base):
     category = Column(SQLEnum(SafetyCategory), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # Supports per-prefix analytics over time without sequential scans
+        Index("ix_safety_session_prefix_created", "session_id_prefix", "created_at"),
+    )
+
     def __repr__(self):
         return f"<SafetyIntervention {self.category.value} at {self.created_at}>"
@@ -1,7 +1,8 @@
 """
 Prompt library loader for the Life Story Chatbot.
 
-Loads prompt templates from YAML files and supports variable interpolation.
+Loads prompt templates from YAML files at import time and supports variable
+interpolation.
 
 Usage:
     from app.prompts import get_prompt, render_prompt, get_safety_response
@@ -9,13 +10,17 @@ Usage:
     # Get a raw prompt string
     base = get_prompt("system", "base")
 
+    # Static prompts are also exposed as precomputed constants
+    from app.prompts import SYSTEM_BASE, SUMMARY_SYSTEM
+
     # Get a prompt with variables filled in
-    prompt = render_prompt("system", "with_summary", base=base, summary="...")
+    prompt = render_prompt("system", "summary_context", summary="...")
 
     # Get a safety response template
     response = get_safety_response("medical")
 """
 
+import functools
 from pathlib import Path
 from typing import Dict
 
@@ -34,6 +39,13 @@ def _load(file: str) -> dict:
     return _cache[file]
 
 
+def _load_all():
+    """Eagerly load every YAML prompt file in the prompts directory."""
+    for path in _PROMPTS_DIR.glob("*.yaml"):
+        _load(path.stem)
+
+
+@functools.lru_cache(maxsize=256)
 def get_prompt(file: str, key: str) -> str:
     """Get a raw prompt string from a YAML file.
 
@@ -53,8 +65,7 @@ def render_prompt(file: str, key: str, **variables) -> str:
         key: Top-level key within the YAML file
         **variables: Values to substitute into {placeholders}
     """
-    template = get_prompt(file, key)
-    return template.format(**variables).strip()
+    return get_prompt(file, key).format_map(variables).strip()
 
 
 def get_safety_response(category: str) -> str:
@@ -67,5 +78,18 @@ def get_safety_response(category: str) -> str:
 
 
 def reload():
-    """Clear the prompt cache. Useful during development."""
+    """Clear the prompt cache and reload all files. Useful during development.
+
+    Note that the module-level constants below keep the values from import time,
+    and a SafetyRouter keeps its responses until reload_responses() is called.
+    """
     _cache.clear()
+    get_prompt.cache_clear()
+    _load_all()
+
+
+_load_all()
+
+# Static prompts used on every request, resolved once at import
+SYSTEM_BASE = get_prompt("system", "base")
+SUMMARY_SYSTEM = get_prompt("summary", "system")
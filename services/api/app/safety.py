@@ -12,31 +12,143 @@ Following the principle that the system is NOT a medical device and must
 redirect users to appropriate professional resources.
 """
 
+import codecs
+import functools
+import logging
+import os
 import re
-from typing import Dict, List, Optional, Tuple
+import threading
+from typing import Dict, FrozenSet, List, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
 
 from . import prompts
 
+logger = logging.getLogger("lifestory.safety")
+
+# Number of normalized messages whose results are memoized per router. Set to 0
+# to disable, e.g. where message text must not be kept in memory.
+SAFETY_CACHE_SIZE = int(os.getenv("SAFETY_CACHE_SIZE", "4096"))
+
+# Optional Hyperscan/Vectorscan bindings for SIMD multi-pattern batch scanning
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# PCRE2-JIT matcher compiled from _safety_ext.pyx by the Dockerfile. Without
+# it (e.g. a local checkout) the patterns run on the stdlib engine instead.
+try:
+    from ._safety_ext import SafetyRouterC
+except ImportError:
+    SafetyRouterC = None
+
+# A pattern of the form \b(?:a|b|c)\b, and letters-only text
+_KEYWORD_GROUP = re.compile(r"\\b\(\?:(.*)\)\\b")
+_LITERAL = re.compile(r"[a-z ]+")
+
+# Wildcards inside an alternative, e.g. the "[^\n]{0,10}" in
+# what[^\n]{0,10}wrong or the "." in don.t
+_WILDCARD = re.compile(r"(?:\.|\[[^\]]*\])(?:\{\d+,\d+\})?")
+
+# English letters from most to least frequent, used to pick prefilter anchors
+_LETTER_FREQUENCY = "etaoinshrdlcumwfgypbvkjxqz"
+
+
+# Lowercases ASCII letters in a bytes object, leaving every other byte alone
+_ASCII_LOWER = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", b"abcdefghijklmnopqrstuvwxyz")
+
+# Lowercase non-ASCII letters that case-insensitive Unicode matching treats as
+# ASCII ones, so "ſuicide" still reads as "suicide"
+_ASCII_FOLDS = {"ı": "i", "ſ": "s"}
+
+
+def _encode_non_ascii(error: UnicodeEncodeError) -> Tuple[str, int]:
+    """
+    Encoding error handler for _normalize.
+
+    A non-ASCII letter or digit becomes "_", which is still a word character,
+    so "sueño" stays one word and doesn't match "sue". Anything else (accents
+    written as combining marks, punctuation, emoji) becomes a space.
+    """
+    replacement = "".join(
+        _ASCII_FOLDS.get(ch) or ("_" if ch.isalnum() else " ")
+        for ch in error.object[error.start:error.end]
+    )
+    return replacement, error.end
+
+
+codecs.register_error("lifestory.safety", _encode_non_ascii)
+
+
+def _normalize(message: str) -> bytes:
+    """
+    Lowercase a message into ASCII bytes for matching.
+
+    All patterns are ASCII, so matching bytes skips Unicode case handling in
+    the regex engine. ASCII messages, the usual case, only need a bytes
+    translate. Others are lowercased as text first, then non-ASCII characters
+    are replaced so that word boundaries (\\b) fall where they do in the text.
+    Surrounding whitespace is left alone; \\b doesn't depend on it.
+    """
+    if message.isascii():
+        return message.encode("ascii").translate(_ASCII_LOWER)
+    return message.lower().encode("ascii", "lifestory.safety")
+
+
+def _compile(pattern: str):
+    """
+    Compile a safety pattern, as bytes, for the stdlib fallback.
+
+    Messages are lowercased by _normalize and every pattern is lowercase, so
+    no case-insensitive flag is needed.
+    """
+    return re.compile(pattern.encode("ascii"))
+
+
+def _anchor_letters(patterns: List[str]) -> Optional[FrozenSet[int]]:
+    """
+    Pick one required letter from every alternative of every pattern.
+
+    Each alternative contributes its rarest letter, returned as byte values.
+    A message containing none of the returned letters cannot match any
+    pattern. Returns None if a pattern doesn't have the \\b(?:a|b|c)\\b shape
+    this relies on.
+    """
+    anchors = set()
+    for source in patterns:
+        group = _KEYWORD_GROUP.fullmatch(source)
+        if not group or "(" in group.group(1):
+            return None
+        for alternative in group.group(1).split("|"):
+            letters = _WILDCARD.sub("", alternative).replace(" ", "")
+            if not letters or not _LITERAL.fullmatch(letters):
+                return None
+            anchors.add(max(letters, key=_LETTER_FREQUENCY.index))
+    return frozenset(ord(letter) for letter in anchors)
+
 
 class SafetyCategory(Enum):
+    """Categories for safety interventions. Also the type of SafetyIntervention.category."""
     MEDICAL = "medical"
     LEGAL = "legal"
     CRISIS = "crisis"
-    SELF_HARM = "self_harm"
     INAPPROPRIATE = "inappropriate"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SafetyResult:
     is_safe: bool
     category: Optional[SafetyCategory] = None
     confidence: float = 0.0
-    matched_patterns: List[str] = None
+    match_id: Optional[int] = None  # Index of the first pattern that matched; see SafetyRouter.matched_source
     safe_response: Optional[str] = None
 
 
+# Every safe message gets this same instance
+_SAFE = SafetyResult(is_safe=True)
+
+
 class SafetyRouter:
     """
     Rule-based safety router for detecting high-risk content.
@@ -48,33 +160,36 @@ class SafetyRouter:
     def __init__(self):
         self.medical_patterns = [
             r'\b(?:diagnose|diagnosis|treatment|medicine|medication|prescription|pills|disease|illness|symptoms|pain|hurt|doctor|hospital|emergency)\b',
-            r'\b(?:what.{0,10}wrong.{0,10}me|am.{0,5}i.{0,5}sick|feel.{0,10}unwell|health.{0,10}problem)\b',
-            r'\b(?:should.{0,5}i.{0,5}take|what.{0,10}medicine|medical.{0,10}advice)\b'
+            r'\b(?:what[^\n]{0,10}wrong[^\n]{0,10}me|am[^\n]{0,5}i[^\n]{0,5}sick|feel[^\n]{0,10}unwell|health[^\n]{0,10}problem)\b',
+            r'\b(?:should[^\n]{0,5}i[^\n]{0,5}take|what[^\n]{0,10}medicine|medical[^\n]{0,10}advice)\b'
         ]
 
         self.legal_patterns = [
-            r'\b(?:legal|lawyer|attorney|court|sue|lawsuit|contract|will|testament|legal.{0,10}advice)\b',
-            r'\b(?:what.{0,10}my.{0,10}rights|can.{0,5}i.{0,5}sue|legal.{0,10}help)\b'
+            r'\b(?:legal|lawyer|attorney|court|sue|lawsuit|contract|will|testament|legal[^\n]{0,10}advice)\b',
+            r'\b(?:what[^\n]{0,10}my[^\n]{0,10}rights|can[^\n]{0,5}i[^\n]{0,5}sue|legal[^\n]{0,10}help)\b'
         ]
 
         self.crisis_patterns = [
-            r'\b(?:kill.{0,10}myself|end.{0,10}my.{0,10}life|want.{0,10}to.{0,10}die|suicide|suicidal)\b',
-            r'\b(?:hurt.{0,10}myself|harm.{0,10}myself|don.t.{0,10}want.{0,10}to.{0,10}live)\b',
-            r'\b(?:emergency|help.{0,5}me|crisis|desperate)\b'
+            r'\b(?:kill[^\n]{0,10}myself|end[^\n]{0,10}my[^\n]{0,10}life|want[^\n]{0,10}to[^\n]{0,10}die|suicide|suicidal)\b',
+            r'\b(?:hurt[^\n]{0,10}myself|harm[^\n]{0,10}myself|don.t[^\n]{0,10}want[^\n]{0,10}to[^\n]{0,10}live)\b',
+            r'\b(?:emergency|help[^\n]{0,5}me|crisis|desperate)\b'
         ]
 
         self.inappropriate_patterns = [
-            r'\b(?:ignore.{0,10}instructions|pretend.{0,10}you.{0,10}are|act.{0,10}like|roleplay)\b'
+            r'\b(?:ignore[^\n]{0,10}instructions|pretend[^\n]{0,10}you[^\n]{0,10}are|act[^\n]{0,10}like|roleplay)\b'
         ]
 
-        # Compile patterns for efficiency
-        self.compiled_patterns = {
-            SafetyCategory.MEDICAL: [re.compile(p, re.IGNORECASE) for p in self.medical_patterns],
-            SafetyCategory.LEGAL: [re.compile(p, re.IGNORECASE) for p in self.legal_patterns],
-            SafetyCategory.CRISIS: [re.compile(p, re.IGNORECASE) for p in self.crisis_patterns],
-            SafetyCategory.INAPPROPRIATE: [re.compile(p, re.IGNORECASE) for p in self.inappropriate_patterns]
+        category_patterns = {
+            SafetyCategory.MEDICAL: self.medical_patterns,
+            SafetyCategory.LEGAL: self.legal_patterns,
+            SafetyCategory.CRISIS: self.crisis_patterns,
+            SafetyCategory.INAPPROPRIATE: self.inappropriate_patterns,
         }
 
+        # Letters at least one of which every pattern needs; messages without
+        # any of them (short replies like "hi" or "no") skip matching entirely
+        self._anchors = _anchor_letters([p for patterns in category_patterns.values() for p in patterns])
+
         # Map categories to their YAML keys for safe response lookup
         self._response_keys = {
             SafetyCategory.MEDICAL: "medical",
@@ -83,6 +198,72 @@ class SafetyRouter:
             SafetyCategory.INAPPROPRIATE: "inappropriate",
         }
 
+        # Every pattern in category order, so the lowest matching index is the answer
+        self._ordered_patterns = [(category, source) for category, patterns in category_patterns.items() for source in patterns]
+
+        # With the PCRE2-JIT extension built, one call checks every pattern in
+        # order. Otherwise the same patterns are searched one by one with re,
+        # behind a single alternation of all of them that rules out safe messages.
+        self._native = None
+        self._any = None
+        self._searches = ()
+        if SafetyRouterC is not None:
+            self._native = SafetyRouterC([source.encode("ascii") for _, source in self._ordered_patterns])
+        else:
+            logger.info("PCRE2 safety extension not built; matching with re")
+            self._any = _compile("|".join(f"(?:{source})" for _, source in self._ordered_patterns)).search
+            self._searches = tuple(_compile(source).search for _, source in self._ordered_patterns)
+
+        # Hyperscan database of every pattern for check_safety_batch, ids in the same order
+        self._hs_db = None
+        if hyperscan is not None:
+            self._hs_db = hyperscan.Database()
+            self._hs_db.compile(
+                expressions=[source.encode("ascii") for _, source in self._ordered_patterns],
+                ids=list(range(len(self._ordered_patterns))),
+                elements=len(self._ordered_patterns),
+                flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(self._ordered_patterns),
+            )
+
+        # Memoize results per normalized message; short openers repeat a lot.
+        # The cache lives on the instance, so a rebuilt router starts empty.
+        if SAFETY_CACHE_SIZE > 0:
+            self._check_normalized = functools.lru_cache(maxsize=SAFETY_CACHE_SIZE)(self._scan)
+        else:
+            self._check_normalized = self._scan
+
+        # Response templates and the prebuilt results that carry them
+        self.reload_responses()
+
+    def reload_responses(self) -> None:
+        """
+        Resolve the safety response templates into prebuilt results.
+
+        Runs once at construction. Call again after prompts.reload() to pick up
+        edited templates; memoized results are dropped so they take effect at once.
+        """
+        # Resolve the response templates once instead of on every unsafe hit
+        self.safe_responses = {
+            category: prompts.get_safety_response(key)
+            for category, key in self._response_keys.items()
+        }
+
+        # One prebuilt (frozen) result per (category, pattern), shared between callers
+        self._results: Dict[Tuple[SafetyCategory, str], SafetyResult] = {
+            (category, source): SafetyResult(
+                is_safe=False,
+                category=category,
+                confidence=1.0,  # Simple binary classification for now
+                match_id=match_id,
+                safe_response=self.safe_responses[category]
+            )
+            for match_id, (category, source) in enumerate(self._ordered_patterns)
+        }
+        self._ordered_results = [self._results[key] for key in self._ordered_patterns]
+
+        if hasattr(self._check_normalized, "cache_clear"):
+            self._check_normalized.cache_clear()
+
     def check_safety(self, message: str) -> SafetyResult:
         """
         Check if a message contains high-risk content.
@@ -93,26 +274,66 @@ class SafetyRouter:
         Returns:
             SafetyResult with safety determination and response if unsafe
         """
-        message_lower = message.lower().strip()
-
-        # Check each category
-        for category, patterns in self.compiled_patterns.items():
-            matched_patterns = []
-            for pattern in patterns:
-                if pattern.search(message_lower):
-                    matched_patterns.append(pattern.pattern)
-
-            if matched_patterns:
-                return SafetyResult(
-                    is_safe=False,
-                    category=category,
-                    confidence=1.0,  # Simple binary classification for now
-                    matched_patterns=matched_patterns,
-                    safe_response=prompts.get_safety_response(self._response_keys[category])
-                )
+        message_lower = _normalize(message)
+
+        if self._anchors is not None and self._anchors.isdisjoint(message_lower):
+            return _SAFE
+
+        return self._check_normalized(message_lower)
+
+    def check_safety_batch(self, messages: List[str]) -> List[SafetyResult]:
+        """
+        Check many messages at once, e.g. for moderation or log replay.
+
+        Scans with a single Hyperscan database when the bindings are installed,
+        otherwise falls back to check_safety per message.
+
+        Args:
+            messages: User messages to check
+
+        Returns:
+            One SafetyResult per message, in order
+        """
+        if self._hs_db is None:
+            return [self.check_safety(message) for message in messages]
+
+        hits: List[int] = []
+
+        def on_match(pattern_id, start, end, flags, context):
+            hits.append(pattern_id)
+            # Nothing outranks the first pattern
+            return pattern_id == 0
+
+        results = []
+        for message in messages:
+            hits.clear()
+            try:
+                self._hs_db.scan(_normalize(message), match_event_handler=on_match)
+            except hyperscan.ScanTerminated:
+                pass
+            results.append(self._ordered_results[min(hits)] if hits else _SAFE)
+        return results
+
+    def _scan(self, message_lower: bytes) -> SafetyResult:
+        """Run the safety patterns over an already normalized message, in priority order."""
+        if self._native is not None:
+            index = self._native.first_match(message_lower)
+            return self._ordered_results[index] if index >= 0 else _SAFE
 
         # If no patterns matched, it's safe
-        return SafetyResult(is_safe=True)
+        if not self._any(message_lower):
+            return _SAFE
+
+        for index, search in enumerate(self._searches):
+            if search(message_lower):
+                return self._ordered_results[index]
+        return _SAFE
+
+    def matched_source(self, result: SafetyResult) -> Optional[str]:
+        """Source of the pattern that produced an unsafe result, if known (e.g. for audits)."""
+        if result.match_id is None:
+            return None
+        return self._ordered_patterns[result.match_id][1]
 
     def log_safety_intervention(self, result: SafetyResult, session_id: str) -> None:
         """
@@ -122,7 +343,26 @@ class SafetyRouter:
             result: SafetyResult that triggered intervention
             session_id: Session ID (for aggregated analytics only)
         """
-        # TODO: Implement privacy-preserving logging
-        # For now, just print (in production, use proper logging)
         if not result.is_safe:
-            print(f"Safety intervention: category={result.category.value}, session={session_id[:8]}...")
\ No newline at end of file
+            logger.info("Safety intervention: category=%s, session=%s...", result.category.value, session_id[:8])
+
+
+_DEFAULT_ROUTER: Optional[SafetyRouter] = None
+_DEFAULT_ROUTER_LOCK = threading.Lock()
+
+
+def get_safety_router() -> SafetyRouter:
+    """
+    Shared SafetyRouter instance, built on first use.
+
+    Usable as a FastAPI dependency so patterns are compiled once per process
+    rather than per request. The app lifespan calls it at startup so no request
+    pays for the build. Safe to call from the threadpool that runs sync
+    dependencies.
+    """
+    global _DEFAULT_ROUTER
+    if _DEFAULT_ROUTER is None:
+        with _DEFAULT_ROUTER_LOCK:
+            if _DEFAULT_ROUTER is None:
+                _DEFAULT_ROUTER = SafetyRouter()
+    return _DEFAULT_ROUTER
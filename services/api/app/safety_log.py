@@ -0,0 +1,113 @@
+"""
+Batched writer for safety intervention records.
+
+The chat endpoint enqueues interventions without touching the database; a
+background task started in the app lifespan drains the queue and writes each
+batch with a single bulk INSERT, amortizing one commit across many rows.
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from .database import AsyncSessionLocal
+from .models import SafetyCategory, SafetyIntervention
+
+logger = logging.getLogger("lifestory.safety_log")
+
+# Flush whenever this many records are pending or this many seconds have passed
+FLUSH_BATCH_SIZE = 100
+FLUSH_INTERVAL = 0.5
+
+# Records beyond this are dropped rather than blocking requests
+QUEUE_MAXSIZE = 10_000
+
+_STOP = object()
+
+_queue: Optional[asyncio.Queue] = None
+_task: Optional[asyncio.Task] = None
+
+
+def enqueue(session_id: str, category: SafetyCategory) -> None:
+    """Queue a safety intervention for the next batch. Never blocks."""
+    if _queue is None:
+        logger.warning("Safety log writer not running; dropping intervention")
+        return
+
+    record = {
+        "id": uuid.uuid4(),
+        "session_id_prefix": session_id[:8],  # Truncated for privacy
+        "category": category,
+        "created_at": datetime.utcnow(),
+    }
+    try:
+        _queue.put_nowait(record)
+    except asyncio.QueueFull:
+        logger.warning("Safety log queue full; dropping intervention")
+
+
+async def _flush(records: List[dict]) -> None:
+    """Write a batch of records in one transaction."""
+    if not records:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(SafetyIntervention), records)
+            await db.commit()
+    except Exception as e:
+        logger.warning("Failed to log %d safety interventions: %s", len(records), e)
+
+
+async def _run() -> None:
+    """Drain the queue in batches until the stop sentinel is received."""
+    loop = asyncio.get_running_loop()
+
+    while True:
+        item = await _queue.get()
+        if item is _STOP:
+            return
+
+        batch = [item]
+        deadline = loop.time() + FLUSH_INTERVAL
+        stopping = False
+
+        while len(batch) < FLUSH_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                stopping = True
+                break
+            batch.append(item)
+
+        await _flush(batch)
+
+        if stopping:
+            return
+
+
+async def start() -> None:
+    """Start the background writer. Called from the app lifespan."""
+    global _queue, _task
+    if _task is not None:
+        return
+    _queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+    _task = asyncio.create_task(_run())
+
+
+async def stop() -> None:
+    """Flush pending records and stop the background writer."""
+    global _queue, _task
+    if _task is None:
+        return
+    await _queue.put(_STOP)
+    await _task
+    _queue, _task = None, None